@@ -7,13 +7,18 @@ Uses FastMCP for automatic schema generation from type hints.
 """
 
 import asyncio
+import functools
+import itertools
 import logging
 import os
 import re
+import secrets
 import subprocess
 import shutil
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Literal
+from typing import Literal, NamedTuple
 
 from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel, Field
@@ -25,7 +30,36 @@ logger = logging.getLogger(__name__)
 # --- Configuration ---
 
 BASE_PATH = Path(os.environ.get("LATEX_SERVER_BASE_PATH", ".")).resolve()
+BASE_PREFIX = os.path.join(str(BASE_PATH), "")  # with trailing separator
 TEMPLATES_DIR = Path(__file__).parent / "templates"
+IO_BUFFER_SIZE = 128 * 1024  # larger than the 8 KiB default; fewer read/write syscalls
+# Directories never descended into by recursive listings (hidden dirs are skipped too)
+SKIP_DIRS = frozenset({"node_modules", "__pycache__", "_build", "build", "dist"})
+
+# --- Precompiled Patterns ---
+
+COMMENT_RE = re.compile(r"(?<!\\)%.*")
+VERBATIM_RE = re.compile(r"\\begin\{verbatim\}.*?\\end\{verbatim\}", re.DOTALL)
+# kind is None for \documentclass, which only needs to be present
+LATEX_COMMAND_RE = re.compile(
+    r"\\(?:documentclass|(?P<kind>begin|end|ref|label)\{(?P<arg>[^}]+)\})"
+)
+# Only \documentclass and \usepackage may take [options]; short forms such as
+# \section[short]{...} and \title[short]{...} are not reported
+STRUCTURE_RE = re.compile(
+    r"\\(?P<kind>documentclass|title|author|usepackage"
+    r"|part|chapter|section|subsection|subsubsection)"
+    r"(?:(?:(?<=documentclass)|(?<=usepackage))\[[^\]]*\])?\{(?P<arg>[^}]+)\}"
+)
+SECTION_LEVELS = {
+    "part": "Part",
+    "chapter": "Chapter",
+    "section": "Section",
+    "subsection": "Subsection",
+    "subsubsection": "Subsubsection",
+}
+# TeX engines report errors on lines starting with "!"
+LOG_ERROR_RE = re.compile(r"^![^\r\n]*", re.MULTILINE)
 
 # --- Structured Output Models ---
 
@@ -84,19 +118,222 @@ def get_safe_path(file_path: str) -> Path:
     path = Path(file_path)
     if not path.is_absolute():
         path = BASE_PATH / path
+    # resolve() follows symlinks, so links pointing outside BASE_PATH are caught
     resolved = path.resolve()
-    try:
-        resolved.relative_to(BASE_PATH)
-    except ValueError:
+    resolved_str = str(resolved)
+    if resolved_str != str(BASE_PATH) and not resolved_str.startswith(BASE_PREFIX):
         raise ValueError(
             f"Access denied: '{file_path}' resolves outside the allowed directory ({BASE_PATH})"
         )
     return resolved
 
 
+# --- Filesystem Helpers ---
+
+
+def iter_tex_entries(directory: Path, recursive: bool = False):
+    """Yield os.DirEntry objects for .tex files under directory.
+
+    Unreadable directories are skipped, and the suffix match follows the
+    platform's case rules (``Paper.TEX`` matches on Windows), as Path.glob did.
+    """
+    stack = [os.fspath(directory)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except PermissionError:
+            continue
+        with it:
+            for entry in it:
+                if os.path.normcase(entry.name).endswith(".tex") and entry.is_file():
+                    yield entry
+                elif (
+                    recursive
+                    and not entry.name.startswith(".")
+                    and entry.name not in SKIP_DIRS
+                    and entry.is_dir(follow_symlinks=False)
+                ):
+                    stack.append(entry.path)
+
+
+def list_tex_files(directory: Path, recursive: bool = False) -> list[tuple[str, int]]:
+    """Return sorted (path relative to BASE_PATH, size in bytes) pairs for .tex files."""
+    prefix_len = len(BASE_PREFIX)
+    return sorted(
+        (
+            entry.path[prefix_len:] if entry.path.startswith(BASE_PREFIX) else entry.path,
+            entry.stat().st_size,
+        )
+        for entry in iter_tex_entries(directory, recursive)
+    )
+
+
+def read_text_file(path: Path) -> str:
+    """Read a UTF-8 text file using a large I/O buffer."""
+    with open(path, "r", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
+        return f.read()
+
+
+# Windows cannot replace a file while another handle (e.g. a reader) has it open
+REPLACE_RETRY_DELAYS = (0.01, 0.05, 0.1)
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+
+def write_text_file(path: Path, text: str) -> None:
+    """Atomically write a UTF-8 text file using a large I/O buffer.
+
+    The text goes to a temporary file in the same directory that then
+    replaces path, so readers see either the old or the new content and
+    never an empty or partly written file. If Windows keeps refusing the
+    replace because path is open elsewhere, path is rewritten in place.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None  # new file: os.open applies the umask to 0o666
+    tmp = path.with_name(f".{path.name}.{secrets.token_hex(4)}.tmp")
+    fd = os.open(tmp, _TEMP_FLAGS, 0o666)
+    try:
+        with open(fd, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
+            f.write(text)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        for delay in REPLACE_RETRY_DELAYS:
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                if os.name != "nt":
+                    raise
+                time.sleep(delay)
+        with open(path, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
+            f.write(text)
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:  # usually already renamed over path
+            pass
+
+
+def append_text_file(path: Path, text: str) -> None:
+    """Append UTF-8 text to a file, first adding a newline if it lacks a trailing one.
+
+    Newlines are written as os.linesep, matching the text-mode writes of
+    write_text_file, so appending never mixes line endings on Windows.
+    """
+    with open(path, "ab+", buffering=IO_BUFFER_SIZE) as f:
+        if f.seek(0, os.SEEK_END):
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":  # also the last byte of \r\n
+                text = "\n" + text
+        f.write(text.replace("\n", os.linesep).encode("utf-8"))
+
+
+# --- Content Cache ---
+
+CONTENT_CACHE_SIZE = 32
+# str(path) -> (st_mtime_ns, st_size, content), least recently used first
+_content_cache: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+# str(path) -> [reads in flight, invalidations since the first of them began];
+# an entry lives only while a read is pending, so the dict stays small
+_pending_reads: dict[str, list[int]] = {}
+
+
+async def read_text_cached(path: Path) -> str:
+    """Read a text file, reusing the previous read while its mtime and size are unchanged."""
+    key = str(path)
+    pending = _pending_reads.setdefault(key, [0, 0])
+    pending[0] += 1
+    generation = pending[1]
+    try:
+        st = await asyncio.to_thread(os.stat, path)
+        cached = _content_cache.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            _content_cache.move_to_end(key)
+            return cached[2]
+
+        content = await asyncio.to_thread(read_text_file, path)
+        if pending[1] != generation:
+            return content  # written while we read; stat may not match content
+        _content_cache[key] = (st.st_mtime_ns, st.st_size, content)
+        _content_cache.move_to_end(key)
+        if len(_content_cache) > CONTENT_CACHE_SIZE:
+            _content_cache.popitem(last=False)
+        return content
+    finally:
+        pending[0] -= 1
+        if not pending[0]:
+            del _pending_reads[key]
+
+
+def invalidate_cached(path: Path) -> None:
+    """Drop the cached read of path; a same-size rewrite can keep its mtime."""
+    key = str(path)
+    _content_cache.pop(key, None)
+    pending = _pending_reads.get(key)
+    if pending is not None:
+        pending[1] += 1  # reads already in flight must not store their result
+
+
+# --- Analysis Helpers ---
+
+
+def count_braces(text: str) -> tuple[int, int]:
+    """Count unescaped { and } outside verbatim blocks, without copying text."""
+    opens = text.count("{") - text.count("\\{")
+    closes = text.count("}") - text.count("\\}")
+    for m in VERBATIM_RE.finditer(text):
+        block = m.group()
+        opens -= block.count("{") - block.count("\\{")
+        closes -= block.count("}") - block.count("\\}")
+    return opens, closes
+
+
+def line_offset(text: str, line_number: int) -> int:
+    """Return the offset where 1-based line_number starts, or -1 if out of range."""
+    if line_number < 1:
+        return -1
+    offset = 0
+    for _ in range(line_number - 1):
+        offset = text.find("\n", offset) + 1
+        if offset == 0:
+            return -1
+    return offset if offset < len(text) else -1
+
+
 # --- Template Generation ---
 
 
+@functools.cache
+def bundled_templates() -> tuple[str, ...]:
+    """Sorted names of the templates shipped in TEMPLATES_DIR (scanned once)."""
+    with os.scandir(TEMPLATES_DIR) as it:
+        return tuple(sorted(
+            entry.name[: -len("_template.tex")]
+            for entry in it
+            if entry.name.endswith("_template.tex") and entry.is_file(follow_symlinks=False)
+        ))
+
+
+CORE_PACKAGES = {
+    "inputenc": "\\usepackage[utf8]{inputenc}",
+    "fontenc": "\\usepackage[T1]{fontenc}",
+    "babel": "\\usepackage[english]{babel}",
+}
+
+
+@functools.lru_cache(maxsize=128)
+def latex_preamble(document_type: str, packages: tuple[str, ...], geometry: str) -> str:
+    """Build the \\documentclass and \\usepackage lines (memoized per input)."""
+    geometry_line = f"\\usepackage[{geometry}]{{geometry}}\n" if geometry else ""
+    # Core packages first; a core name repeated in packages keeps its core options
+    package_lines = "\n".join(
+        CORE_PACKAGES.get(pkg, f"\\usepackage{{{pkg}}}")
+        for pkg in dict.fromkeys(itertools.chain(CORE_PACKAGES, packages))
+    )
+    return f"\\documentclass{{{document_type}}}\n{geometry_line}{package_lines}"
+
+
 def create_latex_template(
     document_type: str,
     title: str,
@@ -107,36 +344,173 @@ def create_latex_template(
     geometry: str,
 ) -> str:
     """Create a LaTeX document from parameters."""
-    parts: list[str] = []
-    parts.append(f"\\documentclass{{{document_type}}}")
-
-    # Core packages
-    if geometry:
-        parts.append(f"\\usepackage[{geometry}]{{geometry}}")
-    parts.append("\\usepackage[utf8]{inputenc}")
-    parts.append("\\usepackage[T1]{fontenc}")
-    parts.append("\\usepackage[english]{babel}")
-
-    for pkg in packages:
-        parts.append(f"\\usepackage{{{pkg}}}")
-
-    if title:
-        parts.append(f"\\title{{{title}}}")
-    if author:
-        parts.append(f"\\author{{{author}}}")
-    if date:
-        parts.append(f"\\date{{{date}}}")
-
-    parts.append("")
-    parts.append("\\begin{document}")
-    if title:
-        parts.append("\\maketitle")
-    parts.append("")
-    parts.append(content if content else "% Your content here")
-    parts.append("")
-    parts.append("\\end{document}")
-
-    return "\n".join(parts)
+    preamble = latex_preamble(document_type, tuple(packages), geometry)
+    title_line = f"\\title{{{title}}}\n" if title else ""
+    author_line = f"\\author{{{author}}}\n" if author else ""
+    date_line = f"\\date{{{date}}}\n" if date else ""
+    maketitle_line = "\\maketitle\n" if title else ""
+    body = content if content else "% Your content here"
+
+    return (
+        f"{preamble}\n{title_line}{author_line}{date_line}"
+        f"\n\\begin{{document}}\n{maketitle_line}\n{body}\n\n\\end{{document}}"
+    )
+
+
+# --- Edit Batching ---
+
+
+class EditOp(NamedTuple):
+    """A single requested edit to a LaTeX file."""
+    operation: str
+    new_text: str
+    search_text: str | None
+    line_number: int | None
+
+
+def edit_replace(content: str, op: EditOp) -> str:
+    """Replace the first occurrence of search_text with new_text."""
+    if not op.search_text:
+        raise ValueError("search_text is required for replace operation")
+    idx = content.find(op.search_text)
+    if idx < 0:
+        raise ValueError(f"search_text not found in file")
+    return content[:idx] + op.new_text + content[idx + len(op.search_text) :]
+
+
+def edit_insert(content: str, op: EditOp) -> str:
+    """Insert new_text before or after the first search_text match or a 1-based line."""
+    operation, new_text, search_text, line_number = op
+    if search_text:
+        idx = content.find(search_text)
+        if idx < 0:
+            raise ValueError("search_text not found in file")
+        if operation == "insert_before":
+            return content[:idx] + new_text + "\n" + content[idx:]
+        idx += len(search_text)
+        return content[:idx] + "\n" + new_text + content[idx:]
+
+    if line_number is None:
+        raise ValueError("search_text or line_number is required for insert operations")
+    start = line_offset(content, line_number)
+    if start < 0:
+        # Count lines the way line_offset does: only "\n" ends a line
+        lines = content.count("\n") + (bool(content) and not content.endswith("\n"))
+        raise ValueError(f"line_number {line_number} out of range (1-{lines})")
+    if operation == "insert_before":
+        return content[:start] + new_text + "\n" + content[start:]
+    end = content.find("\n", start)
+    if end < 0:
+        return content + "\n" + new_text
+    return content[: end + 1] + new_text + "\n" + content[end + 1 :]
+
+
+def edit_append(content: str, op: EditOp) -> str:
+    """Append new_text on its own line (same result as append_text_file on disk)."""
+    if content and not content.endswith("\n"):
+        content += "\n"
+    return content + op.new_text + "\n"
+
+
+def edit_prepend(content: str, op: EditOp) -> str:
+    """Prepend new_text on its own line."""
+    return op.new_text + "\n" + content
+
+
+def edit_write(content: str, op: EditOp) -> str:
+    """Replace the whole file with new_text (used by the create tools)."""
+    return op.new_text
+
+
+EDIT_OPERATIONS = {
+    "replace": edit_replace,
+    "insert_before": edit_insert,
+    "insert_after": edit_insert,
+    "append": edit_append,
+    "prepend": edit_prepend,
+    "write": edit_write,
+}
+
+
+def apply_edit(content: str, op: EditOp) -> str:
+    """Apply one edit operation to file content and return the result."""
+    handler = EDIT_OPERATIONS.get(op.operation)
+    if handler is None:
+        raise ValueError(f"Unknown operation: {op.operation}")
+    return handler(content, op)
+
+
+# Edits waiting for a file; the key exists while that file's flush task runs
+_pending_edits: dict[Path, list[tuple[EditOp, asyncio.Future]]] = {}
+_flush_tasks: set[asyncio.Task] = set()
+
+
+async def submit_edit(path: Path, op: EditOp) -> None:
+    """Queue an edit for path and wait until it has been written.
+
+    Edits to the same file that arrive while a flush is pending or running
+    are coalesced into a single read-modify-write, which also keeps
+    concurrent edits from overwriting each other. The create tools queue
+    their whole-file writes here too, so they cannot race an edit either.
+    """
+    future = asyncio.get_running_loop().create_future()
+    queue = _pending_edits.get(path)
+    if queue is None:
+        queue = _pending_edits[path] = []
+        task = asyncio.create_task(flush_edits(path, queue))
+        _flush_tasks.add(task)
+        task.add_done_callback(_flush_tasks.discard)
+    queue.append((op, future))
+    await future
+
+
+async def flush_edits(path: Path, queue: list[tuple[EditOp, asyncio.Future]]) -> None:
+    """Drain queued edits for path, one batch per read-modify-write."""
+    try:
+        while queue:
+            batch = queue[:]
+            queue.clear()
+            await apply_edit_batch(path, batch)
+    finally:
+        del _pending_edits[path]
+
+
+async def apply_edit_batch(path: Path, batch: list[tuple[EditOp, asyncio.Future]]) -> None:
+    """Apply a batch of edits with one read and one write, resolving each future."""
+    errors: list[Exception | None]
+    try:
+        if all(op.operation == "append" for op, _ in batch):
+            # Write only the new text; no need to read and rewrite the whole file
+            text = "".join(op.new_text + "\n" for op, _ in batch)
+            await asyncio.to_thread(append_text_file, path, text)
+            invalidate_cached(path)
+            errors = [None] * len(batch)
+        else:
+            if batch[0][0].operation == "write":
+                content = ""  # the file may not exist yet and is overwritten anyway
+            else:
+                content = await asyncio.to_thread(read_text_file, path)
+            errors = []
+            for op, _ in batch:
+                try:
+                    content = apply_edit(content, op)
+                except ValueError as e:
+                    errors.append(e)
+                else:
+                    errors.append(None)
+            if any(error is None for error in errors):
+                await asyncio.to_thread(write_text_file, path, content)
+                invalidate_cached(path)
+    except Exception as e:
+        errors = [e] * len(batch)
+
+    for (_, future), error in zip(batch, errors):
+        if future.done():  # caller was cancelled
+            continue
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
 
 
 # --- Server Setup ---
@@ -167,12 +541,12 @@ async def create_latex_file(
 ) -> FileResult:
     """Create a new LaTeX document with specified content and structure."""
     path = get_safe_path(file_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
 
     latex_content = create_latex_template(
         document_type, title, author, date, content, packages, geometry
     )
-    path.write_text(latex_content, encoding="utf-8")
+    await submit_edit(path, EditOp("write", latex_content, None, None))
 
     return FileResult(path=str(path), success=True, message="File created", content=latex_content)
 
@@ -186,12 +560,12 @@ async def create_from_template(
     path = get_safe_path(file_path)
     template_file = TEMPLATES_DIR / f"{template}_template.tex"
 
-    if not template_file.exists():
+    if template not in bundled_templates():
         raise ValueError(f"Template '{template}' not found at {template_file}")
 
-    template_content = template_file.read_text(encoding="utf-8")
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(template_content, encoding="utf-8")
+    template_content = await read_text_cached(template_file)
+    await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+    await submit_edit(path, EditOp("write", template_content, None, None))
 
     return FileResult(path=str(path), success=True, message=f"Created from '{template}' template", content=template_content)
 
@@ -204,7 +578,11 @@ async def edit_latex_file(
     ),
     new_text: str = Field(description="Text to insert or replace with"),
     search_text: str | None = Field(
-        default=None, description="Text to search for (required for replace/insert_before/insert_after)"
+        default=None,
+        description=(
+            "Text to search for; only the first occurrence is used "
+            "(required for replace/insert_before/insert_after)"
+        ),
     ),
     line_number: int | None = Field(
         default=None, description="1-based line number (alternative to search_text for insert operations)"
@@ -215,40 +593,7 @@ async def edit_latex_file(
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    content = path.read_text(encoding="utf-8")
-
-    if operation == "replace":
-        if not search_text:
-            raise ValueError("search_text is required for replace operation")
-        if search_text not in content:
-            raise ValueError(f"search_text not found in file")
-        content = content.replace(search_text, new_text)
-
-    elif operation in ("insert_before", "insert_after"):
-        if search_text:
-            if search_text not in content:
-                raise ValueError("search_text not found in file")
-            if operation == "insert_before":
-                content = content.replace(search_text, f"{new_text}\n{search_text}")
-            else:
-                content = content.replace(search_text, f"{search_text}\n{new_text}")
-        elif line_number is not None:
-            lines = content.splitlines()
-            if not (1 <= line_number <= len(lines)):
-                raise ValueError(f"line_number {line_number} out of range (1-{len(lines)})")
-            idx = line_number - 1 if operation == "insert_before" else line_number
-            lines.insert(idx, new_text)
-            content = "\n".join(lines)
-        else:
-            raise ValueError("search_text or line_number is required for insert operations")
-
-    elif operation == "append":
-        content = content.rstrip("\n") + "\n" + new_text + "\n"
-
-    elif operation == "prepend":
-        content = new_text + "\n" + content
-
-    path.write_text(content, encoding="utf-8")
+    await submit_edit(path, EditOp(operation, new_text, search_text, line_number))
     return FileResult(path=str(path), success=True, message=f"Operation '{operation}' applied")
 
 
@@ -261,29 +606,29 @@ async def read_latex_file(
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    content = path.read_text(encoding="utf-8")
+    content = await read_text_cached(path)
     return FileResult(path=str(path), success=True, message="File read", content=content)
 
 
 @mcp.tool()
 async def list_latex_files(
     directory_path: str = Field(default=".", description="Directory to search"),
-    recursive: bool = Field(default=False, description="Search subdirectories"),
+    recursive: bool = Field(
+        default=False,
+        description=(
+            "Search subdirectories, skipping hidden ones and "
+            "node_modules, __pycache__, _build, build and dist"
+        ),
+    ),
 ) -> FileListResult:
     """List all .tex files in a directory."""
     dir_path = get_safe_path(directory_path)
     if not dir_path.is_dir():
         raise NotADirectoryError(f"Not a directory: {dir_path}")
 
-    pattern = "**/*.tex" if recursive else "*.tex"
-    files = [
-        FileInfo(
-            path=str(f.relative_to(BASE_PATH)),
-            size_bytes=f.stat().st_size,
-        )
-        for f in sorted(dir_path.glob(pattern))
-        if f.is_file()
-    ]
+    # The walk is blocking I/O; run it off the event loop
+    entries = await asyncio.to_thread(list_tex_files, dir_path, recursive)
+    files = [FileInfo(path=rel_path, size_bytes=size) for rel_path, size in entries]
     return FileListResult(directory=str(dir_path), files=files)
 
 
@@ -296,57 +641,57 @@ async def validate_latex(
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    content = path.read_text(encoding="utf-8")
+    content = await read_text_cached(path)
     issues: list[str] = []
 
     # Strip comments before analysis
-    stripped = re.sub(r"(?<!\\)%.*", "", content)
-
-    if "\\documentclass" not in stripped:
-        issues.append("Missing \\documentclass declaration")
-    if "\\begin{document}" not in stripped:
-        issues.append("Missing \\begin{document}")
-    if "\\end{document}" not in stripped:
-        issues.append("Missing \\end{document}")
-
-    # Balanced braces (ignore escaped braces)
-    clean = re.sub(r"\\[{}]", "", stripped)  # remove \{ and \}
-    # Also remove verbatim-like content
-    clean = re.sub(r"\\begin\{verbatim\}.*?\\end\{verbatim\}", "", clean, flags=re.DOTALL)
-    opens = clean.count("{")
-    closes = clean.count("}")
-    if opens != closes:
-        issues.append(f"Unbalanced braces: {opens} opening vs {closes} closing")
-
-    # Environment matching (order-aware with a stack)
-    begin_iter = list(re.finditer(r"\\begin\{([^}]+)\}", stripped))
-    end_iter = list(re.finditer(r"\\end\{([^}]+)\}", stripped))
-
-    events: list[tuple[int, str, str]] = []
-    for m in begin_iter:
-        events.append((m.start(), "begin", m.group(1)))
-    for m in end_iter:
-        events.append((m.start(), "end", m.group(1)))
-    events.sort()
+    stripped = COMMENT_RE.sub("", content)
 
+    # Declarations, environments (order-aware with a stack) and references,
+    # all collected in a single scan
+    has_documentclass = has_begin_document = has_end_document = False
+    env_issues: list[str] = []
     stack: list[str] = []
-    for _, kind, name in events:
-        if kind == "begin":
+    refs: set[str] = set()
+    labels: set[str] = set()
+    for m in LATEX_COMMAND_RE.finditer(stripped):
+        kind, name = m.group("kind", "arg")
+        if kind is None:
+            has_documentclass = True
+        elif kind == "begin":
+            has_begin_document = has_begin_document or name == "document"
             stack.append(name)
-        else:
+        elif kind == "end":
+            has_end_document = has_end_document or name == "document"
             if not stack:
-                issues.append(f"\\end{{{name}}} without matching \\begin")
+                env_issues.append(f"\\end{{{name}}} without matching \\begin")
             elif stack[-1] != name:
-                issues.append(f"Expected \\end{{{stack[-1]}}}, found \\end{{{name}}}")
+                env_issues.append(f"Expected \\end{{{stack[-1]}}}, found \\end{{{name}}}")
                 stack.pop()
             else:
                 stack.pop()
+        elif kind == "ref":
+            refs.add(name)
+        else:
+            labels.add(name)
     for leftover in stack:
-        issues.append(f"Unclosed environment: {leftover}")
+        env_issues.append(f"Unclosed environment: {leftover}")
+
+    if not has_documentclass:
+        issues.append("Missing \\documentclass declaration")
+    if not has_begin_document:
+        issues.append("Missing \\begin{document}")
+    if not has_end_document:
+        issues.append("Missing \\end{document}")
+
+    # Balanced braces (ignore escaped braces)
+    opens, closes = count_braces(stripped)
+    if opens != closes:
+        issues.append(f"Unbalanced braces: {opens} opening vs {closes} closing")
+
+    issues.extend(env_issues)
 
     # Undefined references
-    refs = set(re.findall(r"\\ref\{([^}]+)\}", stripped))
-    labels = set(re.findall(r"\\label\{([^}]+)\}", stripped))
     for r in sorted(refs - labels):
         issues.append(f"Undefined reference: {r}")
 
@@ -362,43 +707,27 @@ async def get_latex_structure(
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    content = path.read_text(encoding="utf-8")
-
-    doc_class = None
-    m = re.search(r"\\documentclass(?:\[[^\]]*\])?\{([^}]+)\}", content)
-    if m:
-        doc_class = m.group(1)
+    content = await read_text_cached(path)
 
-    title = None
-    m = re.search(r"\\title\{([^}]+)\}", content)
-    if m:
-        title = m.group(1)
-
-    author = None
-    m = re.search(r"\\author\{([^}]+)\}", content)
-    if m:
-        author = m.group(1)
-
-    packages = list(dict.fromkeys(re.findall(r"\\usepackage(?:\[[^\]]*\])?\{([^}]+)\}", content)))
-
-    section_patterns = [
-        (r"\\part\{([^}]+)\}", "Part"),
-        (r"\\chapter\{([^}]+)\}", "Chapter"),
-        (r"\\section\{([^}]+)\}", "Section"),
-        (r"\\subsection\{([^}]+)\}", "Subsection"),
-        (r"\\subsubsection\{([^}]+)\}", "Subsubsection"),
-    ]
+    # First occurrence wins for class/title/author; sections keep document order
+    first: dict[str, str] = {}
+    packages: list[str] = []
     sections: list[str] = []
-    for pattern, level in section_patterns:
-        for m in re.finditer(pattern, content):
-            sections.append(f"{level}: {m.group(1)}")
+    for m in STRUCTURE_RE.finditer(content):
+        kind, arg = m.group("kind", "arg")
+        if kind == "usepackage":
+            packages.append(arg)
+        elif kind in SECTION_LEVELS:
+            sections.append(f"{SECTION_LEVELS[kind]}: {arg}")
+        else:
+            first.setdefault(kind, arg)
 
     return StructureInfo(
         path=str(path),
-        document_class=doc_class,
-        title=title,
-        author=author,
-        packages=packages,
+        document_class=first.get("documentclass"),
+        title=first.get("title"),
+        author=first.get("author"),
+        packages=list(dict.fromkeys(packages)),
         sections=sections,
     )
 
@@ -425,7 +754,6 @@ async def compile_latex(
         await ctx.report_progress(0, 2)
 
     # Run twice for references/TOC
-    errors: list[str] = []
     log_output = ""
     for pass_num in range(1, 3):
         proc = await asyncio.create_subprocess_exec(
@@ -444,15 +772,11 @@ async def compile_latex(
             await ctx.report_progress(pass_num, 2)
 
         if proc.returncode != 0:
-            # Extract error lines from log
-            for line in log_output.splitlines():
-                if line.startswith("!"):
-                    errors.append(line)
             return CompileResult(
                 path=str(path),
                 success=False,
                 log_output=log_output[-2000:],  # last 2000 chars
-                errors=errors,
+                errors=LOG_ERROR_RE.findall(log_output),
             )
 
     pdf_path = path.with_suffix(".pdf")
@@ -470,17 +794,15 @@ async def compile_latex(
 @mcp.resource("latex://templates")
 async def list_templates() -> str:
     """List available LaTeX templates."""
-    templates = [f.stem.replace("_template", "") for f in TEMPLATES_DIR.glob("*_template.tex")]
-    return "Available templates: " + ", ".join(sorted(templates))
+    return "Available templates: " + ", ".join(bundled_templates())
 
 
 @mcp.resource("latex://template/{name}")
 async def get_template(name: str) -> str:
     """Get the content of a specific template."""
-    template_file = TEMPLATES_DIR / f"{name}_template.tex"
-    if not template_file.exists():
+    if name not in bundled_templates():
         raise ValueError(f"Template '{name}' not found")
-    return template_file.read_text(encoding="utf-8")
+    return await read_text_cached(TEMPLATES_DIR / f"{name}_template.tex")
 
 
 # --- Entry Point ---
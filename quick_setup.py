@@ -4,27 +4,64 @@ Quick setup script for MCP LaTeX Server.
 Installs dependencies, verifies the server, and configures Claude Desktop.
 """
 
+import importlib
 import json
 import os
 import platform
+import shutil
+import site
 import subprocess
 import sys
 from pathlib import Path
 
+try:  # optional: faster JSON encoding when available
+    import orjson
+except ImportError:
+    orjson = None
+
 SERVER_DIR = Path(__file__).parent.resolve()
 SERVER_FILE = SERVER_DIR / "latex_server.py"
+# Regenerate after changing requirements.txt:
+#   uv pip compile requirements.txt --universal --python-version 3.11 --generate-hashes -o requirements.lock
+LOCK_FILE = SERVER_DIR / "requirements.lock"
+SYSTEM = platform.system()
+
+# The only dynamic field, SERVER_DIR, is fixed for the life of the process
+CLAUDE_SERVER_ENTRY = {
+    "command": "uv",
+    "args": ["--directory", str(SERVER_DIR), "run", "latex_server.py"],
+    "env": {"LATEX_SERVER_BASE_PATH": str(SERVER_DIR)},
+}
+
+# Evaluated lazily so APPDATA / the home dir are only looked up when needed
+CLAUDE_CONFIG_PATHS = {
+    "Windows": lambda: Path(os.environ["APPDATA"]) / "Claude" / "claude_desktop_config.json",
+    "Darwin": lambda: Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json",
+    "Linux": lambda: Path.home() / ".config" / "Claude" / "claude_desktop_config.json",
+}
 
 
 def get_claude_config_path() -> Path:
     """Return the Claude Desktop config path for the current OS."""
-    system = platform.system()
-    if system == "Windows":
-        return Path(os.environ["APPDATA"]) / "Claude" / "claude_desktop_config.json"
-    elif system == "Darwin":
-        return Path.home() / "Library" / "Application Support" / "Claude" / "claude_desktop_config.json"
-    elif system == "Linux":
-        return Path.home() / ".config" / "Claude" / "claude_desktop_config.json"
-    raise RuntimeError(f"Unsupported OS: {system}")
+    config_path = CLAUDE_CONFIG_PATHS.get(SYSTEM)
+    if config_path is None:
+        raise RuntimeError(f"Unsupported OS: {SYSTEM}")
+    return config_path()
+
+
+def load_json(path: Path):
+    """Parse a JSON file (orjson if installed, else the stdlib)."""
+    if orjson:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def dump_json(path: Path, data) -> None:
+    """Write data as 2-space indented JSON with a trailing newline."""
+    if orjson:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+    else:
+        path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
 
 
 def check_python():
@@ -37,44 +74,50 @@ def check_python():
     return True
 
 
-def check_uv() -> bool:
-    """Check if uv is available."""
-    try:
-        subprocess.run(["uv", "--version"], capture_output=True, check=True)
+def check_uv() -> str | None:
+    """Return the path to uv if it is on PATH (no process is spawned)."""
+    uv = shutil.which("uv")
+    if uv:
         print("  uv is available")
-        return True
-    except (FileNotFoundError, subprocess.CalledProcessError):
+    else:
         print("  uv not found — will use pip")
-        return False
+    return uv
 
 
-def install_deps(has_uv: bool):
-    """Install project dependencies."""
+def install_deps(uv: str | None):
+    """Install the pinned dependencies from requirements.lock, then the server itself."""
     print("\nInstalling dependencies...")
-    if has_uv:
-        subprocess.run(["uv", "pip", "install", "-e", str(SERVER_DIR)], check=True)
+    # Everything is pinned and hashed, so there is nothing to resolve and an
+    # already-satisfied environment is a quick no-op. The editable install
+    # uses --no-deps so it cannot pull in anything outside the lock.
+    if uv:
+        subprocess.run([uv, "pip", "install", "-r", str(LOCK_FILE)], check=True)
+        subprocess.run([uv, "pip", "install", "--no-deps", "-e", str(SERVER_DIR)], check=True)
     else:
-        subprocess.run(
-            [sys.executable, "-m", "pip", "install", "-e", str(SERVER_DIR)],
-            check=True,
-        )
+        pip = [sys.executable, "-m", "pip", "install"]
+        subprocess.run([*pip, "--require-hashes", "-r", str(LOCK_FILE)], check=True)
+        subprocess.run([*pip, "--no-deps", "-e", str(SERVER_DIR)], check=True)
     print("  Dependencies installed")
 
 
 def verify_server():
     """Import the server module to verify it loads."""
     print("\nVerifying server...")
-    result = subprocess.run(
-        [sys.executable, "-c", "from latex_server import mcp; print(mcp.name)"],
-        capture_output=True,
-        text=True,
-        cwd=str(SERVER_DIR),
-        timeout=15,
-    )
-    if result.returncode != 0:
-        print(f"  Server verification failed:\n{result.stderr}")
+    # Import in this interpreter rather than starting a second one. Caches are
+    # invalidated so packages installed a moment ago are found. A pip user
+    # install may have just created the user site-packages directory, which
+    # site only puts on sys.path if it existed at startup.
+    if site.ENABLE_USER_SITE:
+        site.addsitedir(site.getusersitepackages())
+    importlib.invalidate_caches()
+    if str(SERVER_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVER_DIR))
+    try:
+        server = importlib.import_module("latex_server")
+    except Exception as e:
+        print(f"  Server verification failed:\n{type(e).__name__}: {e}")
         return False
-    print(f"  Server '{result.stdout.strip()}' loads OK")
+    print(f"  Server '{server.mcp.name}' loads OK")
     return True
 
 
@@ -87,19 +130,22 @@ def configure_claude():
         print(f"  Skipped: {e}")
         return
 
-    config_path.parent.mkdir(parents=True, exist_ok=True)
-    config: dict = {}
-    if config_path.exists():
-        config = json.loads(config_path.read_text(encoding="utf-8"))
+    try:
+        config: dict = load_json(config_path)
+    except FileNotFoundError:
+        config = {}
 
-    config.setdefault("mcpServers", {})
-    config["mcpServers"]["latex-server"] = {
-        "command": "uv",
-        "args": ["--directory", str(SERVER_DIR), "run", "latex_server.py"],
-        "env": {"LATEX_SERVER_BASE_PATH": str(SERVER_DIR)},
-    }
+    servers = config.setdefault("mcpServers", {})
+    if servers.get("latex-server") == CLAUDE_SERVER_ENTRY:
+        print(f"  Config already up to date at {config_path}")
+        return
+    servers["latex-server"] = CLAUDE_SERVER_ENTRY
 
-    config_path.write_text(json.dumps(config, indent=2) + "\n", encoding="utf-8")
+    try:
+        dump_json(config_path, config)
+    except FileNotFoundError:  # first run: Claude's config dir doesn't exist yet
+        config_path.parent.mkdir(parents=True, exist_ok=True)
+        dump_json(config_path, config)
     print(f"  Config written to {config_path}")
     print("  Restart Claude Desktop for changes to take effect")
 
@@ -111,9 +157,9 @@ def main():
     print("\nChecking requirements...")
     if not check_python():
         sys.exit(1)
-    has_uv = check_uv()
+    uv = check_uv()
 
-    install_deps(has_uv)
+    install_deps(uv)
 
     if not verify_server():
         sys.exit(1)
@@ -68,6 +68,76 @@ async def run_tests():
     except Exception as e:
         fail("create_from_template", e)
 
+    # ── 2b. create_from_template — overwrite racing an edit is serialised ──
+    try:
+        target = test_dir / "test_template.tex"
+        await asyncio.gather(
+            create_from_template(file_path=str(target), template="article"),
+            edit_latex_file(file_path=str(target), operation="prepend",
+                            new_text="%% p", search_text=None, line_number=None),
+        )
+        text = target.read_text(encoding="utf-8")
+        assert text.count("\\documentclass{article}") == 1, text
+        assert not list(test_dir.glob(".*.tmp")), list(test_dir.glob(".*.tmp"))
+        ok("create_from_template (overwrite)")
+    except Exception as e:
+        fail("create_from_template (overwrite)", e)
+
+    # ── 2c. create_from_template — overwrite keeps permission bits ──
+    import os
+    if os.name != "posix":
+        print("  SKIP  create_from_template (keeps mode) (needs POSIX permissions)")
+    else:
+        try:
+            target = test_dir / "test_template.tex"
+            os.chmod(target, 0o640)
+            await create_from_template(file_path=str(target), template="article")
+            assert os.stat(target).st_mode & 0o777 == 0o640, oct(os.stat(target).st_mode)
+            ok("create_from_template (keeps mode)")
+        except Exception as e:
+            fail("create_from_template (keeps mode)", e)
+
+    # ── 2d. reads running alongside writes of the same file ──
+    try:
+        target = test_dir / "test_read_write.tex"
+        await create_from_template(file_path=str(target), template="article")
+        results = await asyncio.gather(*(
+            coro
+            for i in range(10)
+            for coro in (
+                read_latex_file(file_path=str(target)),
+                get_latex_structure(file_path=str(target)),
+                edit_latex_file(file_path=str(target), operation="prepend",
+                                new_text=f"% {i}", search_text=None, line_number=None),
+                create_from_template(file_path=str(target), template="article"),
+            )
+        ))
+        assert all(r.success for r in results[::4])
+        ok("reads alongside writes")
+    except Exception as e:
+        fail("reads alongside writes", e)
+
+    # ── 2e. write_text_file — falls back to an in-place write if replace stays locked ──
+    try:
+        import latex_server
+        target = test_dir / "test_locked_replace.tex"
+        target.write_text("old\n", encoding="utf-8")
+        original_replace, original_name = os.replace, os.name
+
+        def locked_replace(src, dst):
+            raise PermissionError("file is open in another process")
+
+        os.replace, os.name = locked_replace, "nt"  # what Windows does with an open reader
+        try:
+            latex_server.write_text_file(target, "new\n")
+        finally:
+            os.replace, os.name = original_replace, original_name
+        assert target.read_text(encoding="utf-8") == "new\n"
+        assert not list(test_dir.glob(".*.tmp")), list(test_dir.glob(".*.tmp"))
+        ok("write_text_file (locked replace)")
+    except Exception as e:
+        fail("write_text_file (locked replace)", e)
+
     # ── 3. read_latex_file ──
     try:
         result = await read_latex_file(file_path=str(test_dir / "test_create.tex"))
@@ -121,6 +191,131 @@ async def run_tests():
     except Exception as e:
         fail("edit_latex_file (insert_after by line)", e)
 
+    # ── 5b. edit_latex_file — in-place and batched appends write the same bytes ──
+    try:
+        import os
+        alone = test_dir / "test_append_alone.tex"
+        batched = test_dir / "test_append_batched.tex"
+        for target in (alone, batched):
+            target.write_text("a\nb", encoding="utf-8")
+        await edit_latex_file(file_path=str(alone), operation="append",
+                              new_text="c", search_text=None, line_number=None)
+        # A prepend in the same batch forces the read-modify-write path
+        await asyncio.gather(
+            edit_latex_file(file_path=str(batched), operation="prepend",
+                            new_text="p", search_text=None, line_number=None),
+            edit_latex_file(file_path=str(batched), operation="append",
+                            new_text="c", search_text=None, line_number=None),
+        )
+        expected = ("a\nb\nc\n").replace("\n", os.linesep).encode("utf-8")
+        assert alone.read_bytes() == expected, alone.read_bytes()
+        assert batched.read_bytes() == b"p" + os.linesep.encode() + expected, batched.read_bytes()
+        ok("edit_latex_file (append line endings)")
+    except Exception as e:
+        fail("edit_latex_file (append line endings)", e)
+
+    # ── 6a. edit_latex_file — only the first match is edited ──
+    try:
+        target = test_dir / "test_first_match.tex"
+        target.write_text("item\nitem\n", encoding="utf-8")
+        await edit_latex_file(file_path=str(target), operation="replace",
+                              new_text="first", search_text="item", line_number=None)
+        await edit_latex_file(file_path=str(target), operation="insert_after",
+                              new_text="after", search_text="item", line_number=None)
+        text = target.read_text(encoding="utf-8")
+        assert text == "first\nitem\nafter\n", repr(text)
+        ok("edit_latex_file (first match only)")
+    except Exception as e:
+        fail("edit_latex_file (first match only)", e)
+
+    # ── 6b. edit_latex_file — concurrent edits are not lost ──
+    try:
+        target = test_dir / "test_concurrent.tex"
+        target.write_text("alpha\nbeta\n", encoding="utf-8")
+        results = await asyncio.gather(
+            edit_latex_file(file_path=str(target), operation="replace",
+                            new_text="ALPHA", search_text="alpha", line_number=None),
+            edit_latex_file(file_path=str(target), operation="prepend",
+                            new_text="% first", search_text=None, line_number=None),
+            edit_latex_file(file_path=str(target), operation="replace",
+                            new_text="x", search_text="missing", line_number=None),
+            edit_latex_file(file_path=str(target), operation="append",
+                            new_text="% last", search_text=None, line_number=None),
+            return_exceptions=True,
+        )
+        assert isinstance(results[2], ValueError), results[2]
+        assert all(not isinstance(r, Exception) for i, r in enumerate(results) if i != 2)
+        text = target.read_text(encoding="utf-8")
+        assert text == "% first\nALPHA\nbeta\n% last\n", repr(text)
+        ok("edit_latex_file (concurrent edits)")
+    except Exception as e:
+        fail("edit_latex_file (concurrent edits)", e)
+
+    # ── 6c. read_latex_file — cached content is dropped after an edit ──
+    try:
+        target = test_dir / "test_cached.tex"
+        target.write_text("alpha\nbeta\n", encoding="utf-8")
+        first = await read_latex_file(file_path=str(target))
+        st = target.stat()
+        await edit_latex_file(file_path=str(target), operation="replace",
+                              new_text="BETA", search_text="beta", line_number=None)
+        # Same size and same mtime: only explicit invalidation can notice the change
+        import os
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        second = await read_latex_file(file_path=str(target))
+        assert first.content == "alpha\nbeta\n"
+        assert second.content == "alpha\nBETA\n", repr(second.content)
+        ok("read_latex_file (cache invalidated by edit)")
+    except Exception as e:
+        fail("read_latex_file (cache invalidated by edit)", e)
+
+    # ── 6d. read_latex_file — a read overlapping a write is not cached ──
+    try:
+        import os
+        import latex_server
+        target = test_dir / "test_cached_race.tex"
+        target.write_text("alpha\nbeta\n", encoding="utf-8")
+        st = target.stat()
+        original_read = latex_server.read_text_file
+
+        def racing_read(path):
+            # Rewrite the file (same size, same mtime) after the stat, mid-read
+            content = original_read(path)
+            latex_server.read_text_file = original_read
+            latex_server.write_text_file(path, "alpha\nBETA\n")
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+            latex_server.invalidate_cached(path)
+            return content
+
+        latex_server.read_text_file = racing_read
+        try:
+            await read_latex_file(file_path=str(target))
+        finally:
+            latex_server.read_text_file = original_read
+        second = await read_latex_file(file_path=str(target))
+        assert second.content == "alpha\nBETA\n", repr(second.content)
+        assert not latex_server._pending_reads, latex_server._pending_reads
+        ok("read_latex_file (read racing a write)")
+    except Exception as e:
+        fail("read_latex_file (read racing a write)", e)
+
+    # ── 6e. edit_latex_file — only "\n" ends a line for line_number ──
+    try:
+        target = test_dir / "test_formfeed.tex"
+        target.write_text("a\fb\n", encoding="utf-8")
+        try:
+            await edit_latex_file(file_path=str(target), operation="insert_after",
+                                  new_text="c", search_text=None, line_number=2)
+            raise AssertionError("line 2 should be out of range")
+        except ValueError as e:
+            assert "(1-1)" in str(e), str(e)
+        await edit_latex_file(file_path=str(target), operation="insert_after",
+                              new_text="c", search_text=None, line_number=1)
+        assert target.read_text(encoding="utf-8") == "a\fb\nc\n", repr(target.read_text(encoding="utf-8"))
+        ok("edit_latex_file (line count with form feed)")
+    except Exception as e:
+        fail("edit_latex_file (line count with form feed)", e)
+
     # ── 7. list_latex_files ──
     try:
         result = await list_latex_files(
@@ -131,6 +326,42 @@ async def run_tests():
     except Exception as e:
         fail("list_latex_files", e)
 
+    # ── 7b. list_latex_files — recursive ──
+    try:
+        nested = test_dir / "nested" / "deeper"
+        nested.mkdir(parents=True, exist_ok=True)
+        (nested / "test_nested.tex").write_text("\\documentclass{article}\n", encoding="utf-8")
+        for skipped in (".git", "node_modules"):
+            (test_dir / skipped).mkdir(exist_ok=True)
+            (test_dir / skipped / "test_skipped.tex").write_text("", encoding="utf-8")
+        flat = await list_latex_files(directory_path=str(test_dir), recursive=False)
+        deep = await list_latex_files(directory_path=str(test_dir), recursive=True)
+        assert not any(f.path.endswith("test_nested.tex") for f in flat.files)
+        assert any(f.path.endswith("test_nested.tex") for f in deep.files)
+        assert not any(f.path.endswith("test_skipped.tex") for f in deep.files)
+        assert [f.path for f in deep.files] == sorted(f.path for f in deep.files)
+        ok("list_latex_files (recursive)")
+    except Exception as e:
+        fail("list_latex_files (recursive)", e)
+
+    # ── 7c. list_latex_files — unreadable subdirectory is skipped ──
+    import os
+    if not hasattr(os, "geteuid") or os.geteuid() == 0:
+        print("  SKIP  list_latex_files (unreadable dir) (needs a non-root POSIX user)")
+    else:
+        locked = test_dir / "locked"
+        locked.mkdir(exist_ok=True)
+        (locked / "test_locked.tex").write_text("", encoding="utf-8")
+        locked.chmod(0)
+        try:
+            result = await list_latex_files(directory_path=str(test_dir), recursive=True)
+            assert any(f.path.endswith("test_nested.tex") for f in result.files)
+            ok("list_latex_files (unreadable dir)")
+        except Exception as e:
+            fail("list_latex_files (unreadable dir)", e)
+        finally:
+            locked.chmod(0o755)
+
     # ── 8. validate_latex — valid file ──
     try:
         result = await validate_latex(file_path=str(test_dir / "test_create.tex"))
@@ -177,6 +408,25 @@ async def run_tests():
     except Exception as e:
         fail("get_latex_structure", e)
 
+    # ── 11b. get_latex_structure — sections in document order ──
+    try:
+        ordered = test_dir / "test_ordered.tex"
+        ordered.write_text(
+            "\\documentclass[11pt]{report}\n\\usepackage[utf8]{inputenc}\n"
+            "\\title[Short]{Skipped}\\title{First}\\title{Second}\n"
+            "\\chapter{One}\n\\section[A]{Skipped}\n\\section{One.A}\n\\chapter{Two}\n",
+            encoding="utf-8",
+        )
+        result = await get_latex_structure(file_path=str(ordered))
+        assert result.document_class == "report"
+        assert result.packages == ["inputenc"]
+        # Only class and packages take [options]; short-form title/section are skipped
+        assert result.title == "First"
+        assert result.sections == ["Chapter: One", "Section: One.A", "Chapter: Two"]
+        ok("get_latex_structure (document order)")
+    except Exception as e:
+        fail("get_latex_structure (document order)", e)
+
     # ── 12. path traversal blocked ──
     try:
         await read_latex_file(file_path="../../etc/passwd")
@@ -186,6 +436,21 @@ async def run_tests():
     except Exception as e:
         fail("path traversal block", e)
 
+    # ── 12b. symlink escaping the base dir blocked ──
+    link = test_dir / "escape_link"
+    try:
+        link.symlink_to(BASE_PATH.parent, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        print("  SKIP  symlink escape block (symlinks unavailable)")
+    else:
+        try:
+            await read_latex_file(file_path=str(link / "anything.tex"))
+            fail("symlink escape block", "should have raised ValueError")
+        except ValueError:
+            ok("symlink escape block")
+        except Exception as e:
+            fail("symlink escape block", e)
+
     # ── 13. file not found raises ──
     try:
         await read_latex_file(file_path=str(test_dir / "nonexistent.tex"))